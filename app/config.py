@@ -1,14 +1,38 @@
 # app/config.py
 import os
-import json
-import boto3
+import time
+import queue
+import atexit
+import orjson
 import logging
+import functools
 from enum import Enum
-from datetime import datetime
-from dotenv import find_dotenv, load_dotenv
+from logging.handlers import QueueHandler, QueueListener
 from starlette.middleware.base import BaseHTTPMiddleware
 
-load_dotenv(find_dotenv())
+# Accepted spellings for boolean flags such as DEBUG_RAG_API and RAG_SKIP_DOTENV
+_TRUTHY_VALUES = frozenset({"true", "1", "yes", "y", "t"})
+
+
+def load_env_file():
+    """Load a local .env file unless RAG_SKIP_DOTENV is set (e.g. env injected by the container)."""
+    if os.environ.get("RAG_SKIP_DOTENV", "False").lower() in _TRUTHY_VALUES:
+        return
+    from dotenv import find_dotenv, load_dotenv
+
+    load_dotenv(find_dotenv())
+
+
+load_env_file()
+
+# Snapshot of the process environment, taken once after .env has been loaded.
+_ENV_CACHE = dict(os.environ)
+
+
+def reload_env_cache():
+    """Refresh the environment snapshot (used by tests that patch os.environ)."""
+    global _ENV_CACHE
+    _ENV_CACHE = dict(os.environ)
 
 
 class EmbeddingsProvider(Enum):
@@ -24,7 +48,7 @@ class EmbeddingsProvider(Enum):
 def get_env_variable(
     var_name: str, default_value: str = None, required: bool = False
 ) -> str:
-    value = os.getenv(var_name)
+    value = _ENV_CACHE.get(var_name)
     if value is None:
         if default_value is None and required:
             raise ValueError(f"Environment variable '{var_name}' not found.")
@@ -32,8 +56,8 @@ def get_env_variable(
     return value
 
 
-RAG_HOST = os.getenv("RAG_HOST", "0.0.0.0")
-RAG_PORT = int(os.getenv("RAG_PORT", 8000))
+RAG_HOST = get_env_variable("RAG_HOST", "0.0.0.0")
+RAG_PORT = int(get_env_variable("RAG_PORT", 8000))
 
 RAG_UPLOAD_DIR = get_env_variable("RAG_UPLOAD_DIR", "./uploads/")
 if not os.path.exists(RAG_UPLOAD_DIR):
@@ -45,6 +69,8 @@ WCD_API_KEY = get_env_variable("WCD_API_KEY", required=True)
 WEAVIATE_COLLECTION_NAME = get_env_variable("WEAVIATE_COLLECTION_NAME", "Documents")
 CHUNK_SIZE = int(get_env_variable("CHUNK_SIZE", "1500"))
 CHUNK_OVERLAP = int(get_env_variable("CHUNK_OVERLAP", "100"))
+WEAVIATE_BATCH_SIZE = int(get_env_variable("WEAVIATE_BATCH_SIZE", "200"))
+WEAVIATE_BATCH_CONCURRENCY = int(get_env_variable("WEAVIATE_BATCH_CONCURRENCY", "4"))
 
 env_value = get_env_variable("PDF_EXTRACT_IMAGES", "False").lower()
 PDF_EXTRACT_IMAGES = True if env_value == "true" else False
@@ -56,16 +82,12 @@ OPENROUTER_API_KEY = get_env_variable("OPENROUTER_API_KEY", "")
 
 HTTP_RES = "http_res"
 HTTP_REQ = "http_req"
+# ISO 8601 (UTC) prefix for JSON log timestamps; milliseconds are appended
+_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
 logger = logging.getLogger()
 
-debug_mode = os.getenv("DEBUG_RAG_API", "False").lower() in (
-    "true",
-    "1",
-    "yes",
-    "y",
-    "t",
-)
+debug_mode = get_env_variable("DEBUG_RAG_API", "False").lower() in _TRUTHY_VALUES
 console_json = get_env_variable("CONSOLE_JSON", "False").lower() == "true"
 
 if debug_mode:
@@ -73,39 +95,42 @@ if debug_mode:
 else:
     logger.setLevel(logging.INFO)
 
-if console_json:
 
-    class JsonFormatter(logging.Formatter):
-        def __init__(self):
-            super(JsonFormatter, self).__init__()
+class JsonFormatter(logging.Formatter):
+    def __init__(self):
+        super(JsonFormatter, self).__init__()
 
-        def format(self, record):
-            json_record = {}
+    def format(self, record):
+        json_record = {}
 
-            json_record["message"] = record.getMessage()
+        json_record["message"] = record.getMessage()
 
-            if HTTP_REQ in record.__dict__:
-                json_record[HTTP_REQ] = record.__dict__[HTTP_REQ]
+        if HTTP_REQ in record.__dict__:
+            json_record[HTTP_REQ] = record.__dict__[HTTP_REQ]
 
-            if HTTP_RES in record.__dict__:
-                json_record[HTTP_RES] = record.__dict__[HTTP_RES]
+        if HTTP_RES in record.__dict__:
+            json_record[HTTP_RES] = record.__dict__[HTTP_RES]
 
-            if record.levelno == logging.ERROR and record.exc_info:
-                json_record["exception"] = self.formatException(record.exc_info)
+        if record.levelno == logging.ERROR and record.exc_info:
+            json_record["exception"] = self.formatException(record.exc_info)
 
-            timestamp = datetime.fromtimestamp(record.created)
-            json_record["timestamp"] = timestamp.isoformat()
+        json_record["timestamp"] = (
+            f"{time.strftime(_TIMESTAMP_FORMAT, time.gmtime(record.created))}"
+            f".{int(record.msecs):03d}Z"
+        )
 
-            # add level
-            json_record["level"] = record.levelname
-            json_record["filename"] = record.filename
-            json_record["lineno"] = record.lineno
-            json_record["funcName"] = record.funcName
-            json_record["module"] = record.module
-            json_record["threadName"] = record.threadName
+        # add level
+        json_record["level"] = record.levelname
+        json_record["filename"] = record.filename
+        json_record["lineno"] = record.lineno
+        json_record["funcName"] = record.funcName
+        json_record["module"] = record.module
+        json_record["threadName"] = record.threadName
 
-            return json.dumps(json_record)
+        return orjson.dumps(json_record, default=str).decode("utf-8")
 
+
+if console_json:
     formatter = JsonFormatter()
 else:
     formatter = logging.Formatter(
@@ -114,22 +139,46 @@ else:
 
 handler = logging.StreamHandler()  # or logging.FileHandler("app.log")
 handler.setFormatter(formatter)
-logger.addHandler(handler)
+
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler that enqueues records untouched.
+
+    The stock prepare() formats the record on the calling thread and drops
+    exc_info so it can be pickled; the queue here is in-process, so the record
+    is passed through and formatted by the listener's handler instead.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+# Request threads only enqueue records; formatting and the locked stream write
+# happen on the listener thread.
+_log_queue = queue.SimpleQueue()
+listener = QueueListener(_log_queue, handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+
+logger.addHandler(LocalQueueHandler(_log_queue))
 
 
 class LogMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
         response = await call_next(request)
 
-        logger_method = logger.info
+        path = request.url.path
+        level = logging.DEBUG if path == "/health" else logging.INFO
 
-        if str(request.url).endswith("/health"):
-            logger_method = logger.debug
+        # Skip building the message entirely when the record would be dropped
+        if not logger.isEnabledFor(level):
+            return response
 
-        logger_method(
-            f"Request {request.method} {request.url} - {response.status_code}",
+        logger.log(
+            level,
+            f"Request {request.method} {path} - {response.status_code}",
             extra={
-                HTTP_REQ: {"method": request.method, "url": str(request.url)},
+                HTTP_REQ: {"method": request.method, "path": path},
                 HTTP_RES: {"status_code": response.status_code},
             },
         )
@@ -158,6 +207,7 @@ HF_TOKEN = get_env_variable("HF_TOKEN", "")
 OLLAMA_BASE_URL = get_env_variable("OLLAMA_BASE_URL", "http://ollama:11434")
 AWS_ACCESS_KEY_ID = get_env_variable("AWS_ACCESS_KEY_ID", "")
 AWS_SECRET_ACCESS_KEY = get_env_variable("AWS_SECRET_ACCESS_KEY", "")
+AWS_DEFAULT_REGION = get_env_variable("AWS_DEFAULT_REGION", "us-east-1")
 GOOGLE_APPLICATION_CREDENTIALS = get_env_variable("GOOGLE_APPLICATION_CREDENTIALS", "")
 
 ## Embeddings
@@ -203,6 +253,7 @@ def init_embeddings(provider, model):
 
         return VertexAIEmbeddings(model=model)
     elif provider == EmbeddingsProvider.BEDROCK:
+        import boto3
         from langchain_aws import BedrockEmbeddings
 
         session = boto3.Session(
@@ -223,84 +274,81 @@ EMBEDDINGS_PROVIDER = EmbeddingsProvider(
     get_env_variable("EMBEDDINGS_PROVIDER", EmbeddingsProvider.OPENAI.value).lower()
 )
 
-if EMBEDDINGS_PROVIDER == EmbeddingsProvider.OPENAI:
-    EMBEDDINGS_MODEL = get_env_variable("EMBEDDINGS_MODEL", "text-embedding-3-small")
+_PROVIDER_DEFAULTS: dict[EmbeddingsProvider, dict] = {
     # 1000 is the default chunk size for OpenAI, but this causes API rate limits to be hit
-    EMBEDDINGS_CHUNK_SIZE = get_env_variable("EMBEDDINGS_CHUNK_SIZE", 200)
-elif EMBEDDINGS_PROVIDER == EmbeddingsProvider.AZURE:
-    EMBEDDINGS_MODEL = get_env_variable("EMBEDDINGS_MODEL", "text-embedding-3-small")
+    EmbeddingsProvider.OPENAI: {"model": "text-embedding-3-small", "chunk_size": 200},
     # 2048 is the default (and maximum) chunk size for Azure, but this often causes unexpected 429 errors
-    EMBEDDINGS_CHUNK_SIZE = get_env_variable("EMBEDDINGS_CHUNK_SIZE", 200)
-elif EMBEDDINGS_PROVIDER == EmbeddingsProvider.HUGGINGFACE:
-    EMBEDDINGS_MODEL = get_env_variable(
-        "EMBEDDINGS_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
-    )
-elif EMBEDDINGS_PROVIDER == EmbeddingsProvider.HUGGINGFACETEI:
-    EMBEDDINGS_MODEL = get_env_variable(
-        "EMBEDDINGS_MODEL", "http://huggingfacetei:3000"
-    )
-elif EMBEDDINGS_PROVIDER == EmbeddingsProvider.GOOGLE_VERTEXAI:
-    EMBEDDINGS_MODEL = get_env_variable("EMBEDDINGS_MODEL", "text-embedding-004")
-elif EMBEDDINGS_PROVIDER == EmbeddingsProvider.OLLAMA:
-    EMBEDDINGS_MODEL = get_env_variable("EMBEDDINGS_MODEL", "nomic-embed-text")
-elif EMBEDDINGS_PROVIDER == EmbeddingsProvider.BEDROCK:
-    EMBEDDINGS_MODEL = get_env_variable(
-        "EMBEDDINGS_MODEL", "amazon.titan-embed-text-v1"
-    )
-    AWS_DEFAULT_REGION = get_env_variable("AWS_DEFAULT_REGION", "us-east-1")
-else:
-    raise ValueError(f"Unsupported embeddings provider: {EMBEDDINGS_PROVIDER}")
+    EmbeddingsProvider.AZURE: {"model": "text-embedding-3-small", "chunk_size": 200},
+    EmbeddingsProvider.HUGGINGFACE: {"model": "sentence-transformers/all-MiniLM-L6-v2"},
+    EmbeddingsProvider.HUGGINGFACETEI: {"model": "http://huggingfacetei:3000"},
+    EmbeddingsProvider.GOOGLE_VERTEXAI: {"model": "text-embedding-004"},
+    EmbeddingsProvider.OLLAMA: {"model": "nomic-embed-text"},
+    EmbeddingsProvider.BEDROCK: {"model": "amazon.titan-embed-text-v1"},
+}
+
+_provider_defaults = _PROVIDER_DEFAULTS[EMBEDDINGS_PROVIDER]
+EMBEDDINGS_MODEL = get_env_variable("EMBEDDINGS_MODEL", _provider_defaults["model"])
+EMBEDDINGS_CHUNK_SIZE = get_env_variable(
+    "EMBEDDINGS_CHUNK_SIZE", _provider_defaults.get("chunk_size")
+)
+
 
-embeddings = init_embeddings(EMBEDDINGS_PROVIDER, EMBEDDINGS_MODEL)
+@functools.lru_cache(maxsize=1)
+def get_embeddings():
+    """Initialize the configured embeddings provider on first use."""
+    embeddings = init_embeddings(EMBEDDINGS_PROVIDER, EMBEDDINGS_MODEL)
+    logger.info(f"Initialized embeddings of type: {type(embeddings)}")
+    return embeddings
 
-logger.info(f"Initialized embeddings of type: {type(embeddings)}")
 
 # Weaviate and Elysia will be initialized in the service layer
 
-known_source_ext = [
-    "go",
-    "py",
-    "java",
-    "sh",
-    "bat",
-    "ps1",
-    "cmd",
-    "js",
-    "ts",
-    "css",
-    "cpp",
-    "hpp",
-    "h",
-    "c",
-    "cs",
-    "sql",
-    "log",
-    "ini",
-    "pl",
-    "pm",
-    "r",
-    "dart",
-    "dockerfile",
-    "env",
-    "php",
-    "hs",
-    "hsc",
-    "lua",
-    "nginxconf",
-    "conf",
-    "m",
-    "mm",
-    "plsql",
-    "perl",
-    "rb",
-    "rs",
-    "db2",
-    "scala",
-    "bash",
-    "swift",
-    "vue",
-    "svelte",
-    "yml",
-    "yaml",
-    "eml",
-]
+known_source_ext = frozenset(
+    {
+        "go",
+        "py",
+        "java",
+        "sh",
+        "bat",
+        "ps1",
+        "cmd",
+        "js",
+        "ts",
+        "css",
+        "cpp",
+        "hpp",
+        "h",
+        "c",
+        "cs",
+        "sql",
+        "log",
+        "ini",
+        "pl",
+        "pm",
+        "r",
+        "dart",
+        "dockerfile",
+        "env",
+        "php",
+        "hs",
+        "hsc",
+        "lua",
+        "nginxconf",
+        "conf",
+        "m",
+        "mm",
+        "plsql",
+        "perl",
+        "rb",
+        "rs",
+        "db2",
+        "scala",
+        "bash",
+        "swift",
+        "vue",
+        "svelte",
+        "yml",
+        "yaml",
+        "eml",
+    }
+)
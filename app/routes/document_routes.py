@@ -1,11 +1,12 @@
 # app/routes/document_routes.py
 import os
+import uuid
+import asyncio
 import hashlib
 import traceback
-import aiofiles
 import aiofiles.os
 from shutil import copyfileobj
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, BinaryIO
 from fastapi import (
     APIRouter,
     Request,
@@ -15,8 +16,10 @@ from fastapi import (
     Form,
     Body,
     Query,
+    Depends,
     status,
 )
+from fastapi.responses import StreamingResponse
 from langchain_core.documents import Document
 from pydantic import BaseModel
 
@@ -28,22 +31,57 @@ from app.models import (
     DocumentResponse,
     QueryMultipleBody,
 )
-from app.services.elysia_service import elysia_service
+from app.services.elysia_service import ElysiaWeaviateService, get_elysia
 from app.utils.document_loader import get_loader, clean_text, process_documents
 from app.utils.health import is_health_ok
 
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 
 class AgenticQueryRequest(BaseModel):
     query: str
     collection_names: Optional[List[str]] = None
 
 
+def _save_upload(src: BinaryIO, file_path: str, hasher: Optional[Any]) -> None:
+    """Copy an upload to disk in large blocks, feeding the hasher if one is given."""
+    with open(file_path, 'wb') as dest:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            if hasher:
+                hasher.update(chunk)
+            dest.write(chunk)
+
+
+def _load_and_clean_documents(
+    file_path: str,
+    filename: str,
+    content_type: Optional[str],
+    extra_metadata: Optional[Dict[str, Any]] = None,
+) -> List[Document]:
+    """Load a saved file and return its non-empty documents with cleaned text."""
+    loader, _, _ = get_loader(filename, content_type, file_path)
+    return [
+        Document(
+            page_content=cleaned_content,
+            metadata={
+                **doc.metadata,
+                "filename": filename,
+                "file_path": file_path,
+                "content_type": content_type,
+                **(extra_metadata or {})
+            }
+        )
+        for doc in loader.load()
+        if (cleaned_content := clean_text(doc.page_content)).strip()
+    ]
+
+
 @router.get("/health")
-async def health_check():
+async def health_check(elysia_service: ElysiaWeaviateService = Depends(get_elysia)):
     try:
-        if await is_health_ok():
+        if await is_health_ok(elysia_service):
             return {"status": "UP"}
         else:
             logger.error("Health check failed")
@@ -58,18 +96,40 @@ async def health_check():
 
 
 @router.get("/ids")
-async def get_all_ids():
-    """Get all document IDs from Weaviate."""
+async def get_all_ids(elysia_service: ElysiaWeaviateService = Depends(get_elysia)):
+    """Get all document IDs from Weaviate, streamed page by page."""
+    pages = elysia_service.iter_document_id_pages()
+
+    # Fetch the first page up front so an unreachable Weaviate is still a 500
     try:
-        ids = await elysia_service.get_all_document_ids()
-        return {"ids": ids, "count": len(ids)}
+        first_page = await anext(pages)
+    except StopAsyncIteration:
+        first_page = []
     except Exception as e:
         logger.error(f"Failed to get all IDs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def stream_ids():
+        count = len(first_page)
+        try:
+            yield '{"ids":[' + ",".join(f'"{doc_id}"' for doc_id in first_page)
+            async for page in pages:
+                yield ("," if count else "") + ",".join(f'"{doc_id}"' for doc_id in page)
+                count += len(page)
+        except Exception as e:
+            # Headers are already sent, so the response can only be cut short
+            logger.error(f"Failed to get all IDs: {e}")
+            raise
+        finally:
+            # Release the pager promptly if the client disconnects mid-stream
+            await pages.aclose()
+        yield f'],"count":{count}}}'
+
+    return StreamingResponse(stream_ids(), media_type="application/json")
+
 
 @router.get("/count")
-async def get_document_count():
+async def get_document_count(elysia_service: ElysiaWeaviateService = Depends(get_elysia)):
     """Get total count of documents in Weaviate."""
     try:
         count = await elysia_service.get_document_count()
@@ -80,7 +140,10 @@ async def get_document_count():
 
 
 @router.post("/query")
-async def query_documents(query_request: QueryRequestBody):
+async def query_documents(
+    query_request: QueryRequestBody,
+    elysia_service: ElysiaWeaviateService = Depends(get_elysia),
+):
     """Simple semantic search using Weaviate."""
     try:
         results = await elysia_service.simple_query(
@@ -104,7 +167,10 @@ async def query_documents(query_request: QueryRequestBody):
 
 
 @router.post("/query/agentic")
-async def agentic_query_documents(query_request: AgenticQueryRequest):
+async def agentic_query_documents(
+    query_request: AgenticQueryRequest,
+    elysia_service: ElysiaWeaviateService = Depends(get_elysia),
+):
     """Advanced agentic query using Elysia decision trees."""
     try:
         response, objects = await elysia_service.query_with_elysia(
@@ -127,40 +193,34 @@ async def agentic_query_documents(query_request: AgenticQueryRequest):
 async def upload_document(
     request: Request,
     file: UploadFile = File(...),
-    file_id: Optional[str] = Form(None)
+    file_id: Optional[str] = Form(None),
+    elysia_service: ElysiaWeaviateService = Depends(get_elysia),
 ):
     """Upload and process a document into Weaviate via Elysia."""
     try:
-        # Generate file_id if not provided
-        if not file_id:
-            file_content = await file.read()
-            await file.seek(0)  # Reset file pointer
-            file_id = hashlib.md5(file_content).hexdigest()
-        
-        # Save file temporarily
-        file_path = os.path.join(RAG_UPLOAD_DIR, f"{file_id}_{file.filename}")
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        # Save file temporarily; hash the upload in the same pass when no file_id is given
+        hasher = None if file_id else hashlib.blake2b(digest_size=16)
+        file_path = os.path.join(
+            RAG_UPLOAD_DIR, f"{file_id or uuid.uuid4().hex}_{file.filename}"
+        )
         
-        # Process document
+        # The cleanup below also covers a failed save or rename, so partial
+        # uploads under the temporary name are not left behind
         try:
-            loader = get_loader(file_path)
-            raw_documents = loader.load()
+            # One worker thread for the whole copy instead of one executor hop per chunk
+            await asyncio.to_thread(_save_upload, file.file, file_path, hasher)
+            
+            # Generate file_id from the content if not provided
+            if hasher:
+                file_id = hasher.hexdigest()
+                hashed_path = os.path.join(RAG_UPLOAD_DIR, f"{file_id}_{file.filename}")
+                await aiofiles.os.rename(file_path, hashed_path)
+                file_path = hashed_path
             
-            # Clean and process documents
-            cleaned_documents = []
-            for doc in raw_documents:
-                cleaned_content = clean_text(doc.page_content)
-                if cleaned_content.strip():
-                    doc.page_content = cleaned_content
-                    doc.metadata.update({
-                        "filename": file.filename,
-                        "file_path": file_path,
-                        "content_type": file.content_type
-                    })
-                    cleaned_documents.append(doc)
+            # Process document; loading and cleaning are blocking, keep them off the event loop
+            cleaned_documents = await asyncio.to_thread(
+                _load_and_clean_documents, file_path, file.filename, file.content_type
+            )
             
             if not cleaned_documents:
                 raise HTTPException(
@@ -199,7 +259,10 @@ async def upload_document(
 
 
 @router.delete("/documents/{file_id}")
-async def delete_document(file_id: str):
+async def delete_document(
+    file_id: str,
+    elysia_service: ElysiaWeaviateService = Depends(get_elysia),
+):
     """Delete all documents associated with a file_id."""
     try:
         success = await elysia_service.delete_documents_by_file_id(file_id)
@@ -223,7 +286,10 @@ async def delete_document(file_id: str):
 
 
 @router.post("/store")
-async def store_document(store_request: StoreDocument):
+async def store_document(
+    store_request: StoreDocument,
+    elysia_service: ElysiaWeaviateService = Depends(get_elysia),
+):
     """Store a document that's already been uploaded."""
     try:
         if not os.path.exists(store_request.filepath):
@@ -232,18 +298,20 @@ async def store_document(store_request: StoreDocument):
                 detail=f"File not found: {store_request.filepath}"
             )
         
-        # Load and process document
-        loader = get_loader(store_request.filepath)
-        documents = loader.load()
+        # Load and process document; loading is blocking, keep it off the event loop
+        documents = await asyncio.to_thread(
+            _load_and_clean_documents,
+            store_request.filepath,
+            store_request.filename,
+            store_request.file_content_type,
+            {"file_id": store_request.file_id}
+        )
         
-        # Add metadata
-        for doc in documents:
-            doc.metadata.update({
-                "filename": store_request.filename,
-                "file_path": store_request.filepath,
-                "content_type": store_request.file_content_type,
-                "file_id": store_request.file_id
-            })
+        if not documents:
+            raise HTTPException(
+                status_code=400,
+                detail="No valid content found in document"
+            )
         
         # Store in Weaviate
         success = await elysia_service.store_documents(documents, store_request.file_id)
@@ -269,7 +337,10 @@ async def store_document(store_request: StoreDocument):
 
 # Stats endpoint for compatibility
 @router.get("/stats/{project_id}")
-async def get_stats(project_id: str):
+async def get_stats(
+    project_id: str,
+    elysia_service: ElysiaWeaviateService = Depends(get_elysia),
+):
     """Get statistics for a project (compatibility endpoint)."""
     try:
         count = await elysia_service.get_document_count()
@@ -1,7 +1,11 @@
 # app/services/elysia_service.py
+import copy
+import asyncio
+import threading
 import weaviate
 from elysia import Tree, tool
-from typing import List, Dict, Any, Optional
+from fastapi import Request
+from typing import List, Dict, Any, Optional, AsyncIterator
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
@@ -11,9 +15,11 @@ from app.config import (
     WEAVIATE_COLLECTION_NAME,
     CHUNK_SIZE,
     CHUNK_OVERLAP,
-    embeddings,
+    WEAVIATE_BATCH_SIZE,
+    WEAVIATE_BATCH_CONCURRENCY,
     logger
 )
+from app.utils.cache import TTLCache
 
 
 class ElysiaWeaviateService:
@@ -21,6 +27,19 @@ class ElysiaWeaviateService:
     
     def __init__(self):
         self.weaviate_client = None
+        self._collection = None
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP
+        )
+        # Weaviate batching and the Elysia tree are not thread-safe; calls to
+        # them from worker threads are serialized with these locks.
+        self._batch_lock = threading.Lock()
+        self._tree_lock = threading.Lock()
+        # Caches are read from the main loop and from Elysia tools running on
+        # the tree's own loop, so they must not be tied to either
+        self._search_cache = TTLCache(maxsize=1024, ttl=30)
+        self._count_cache = TTLCache(maxsize=1, ttl=5)
         self.elysia_tree = Tree()
         self._setup_weaviate_connection()
         self._setup_elysia_tools()
@@ -43,6 +62,8 @@ class ElysiaWeaviateService:
                     auth_credentials=weaviate.auth.AuthApiKey(WCD_API_KEY) if WCD_API_KEY else None,
                 )
                 logger.info("Connected to Weaviate cloud successfully")
+            
+            self._collection = self.weaviate_client.collections.get(WEAVIATE_COLLECTION_NAME)
         except Exception as e:
             logger.error(f"Failed to connect to Weaviate: {e}")
             raise
@@ -53,33 +74,13 @@ class ElysiaWeaviateService:
         @tool(tree=self.elysia_tree)
         async def search_documents(query: str, limit: int = 10) -> List[Dict[str, Any]]:
             """Search for documents in Weaviate using semantic similarity."""
-            try:
-                collection = self.weaviate_client.collections.get(WEAVIATE_COLLECTION_NAME)
-                response = collection.query.near_text(
-                    query=query,
-                    limit=limit
-                )
-                
-                results = []
-                for obj in response.objects:
-                    results.append({
-                        "content": obj.properties.get("content", ""),
-                        "metadata": obj.properties.get("metadata", {}),
-                        "distance": obj.metadata.distance if hasattr(obj.metadata, 'distance') else None
-                    })
-                
-                return results
-            except Exception as e:
-                logger.error(f"Error searching documents: {e}")
-                return []
+            return await self.simple_query(query, limit)
         
         @tool(tree=self.elysia_tree)
         async def get_document_count() -> int:
             """Get the total number of documents in the collection."""
             try:
-                collection = self.weaviate_client.collections.get(WEAVIATE_COLLECTION_NAME)
-                result = collection.aggregate.over_all(total_count=True)
-                return result.total_count or 0
+                return await self.get_document_count()
             except Exception as e:
                 logger.error(f"Error getting document count: {e}")
                 return 0
@@ -88,87 +89,159 @@ class ElysiaWeaviateService:
         async def get_all_document_ids() -> List[str]:
             """Retrieve all document IDs from the collection."""
             try:
-                collection = self.weaviate_client.collections.get(WEAVIATE_COLLECTION_NAME)
-                response = collection.query.fetch_objects(
-                    limit=10000,  # Adjust based on your needs
-                    return_properties=[]
-                )
-                
-                return [str(obj.uuid) for obj in response.objects]
+                return await self.get_all_document_ids()
             except Exception as e:
                 logger.error(f"Error getting document IDs: {e}")
                 return []
         
         logger.info("Elysia tools setup completed")
     
-    async def store_documents(self, documents: List[Document], file_id: str) -> bool:
-        """Store documents in Weaviate with chunking."""
-        try:
-            # Split documents into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=CHUNK_SIZE,
-                chunk_overlap=CHUNK_OVERLAP
+    async def get_document_count(self) -> int:
+        """Get the total number of documents in the collection, cached briefly between writes."""
+        count = self._count_cache.get("count")
+        if count is not None:
+            return count
+        
+        # Read before the request so a count taken before a write isn't cached after it
+        generation = self._count_cache.generation
+        collection = self._collection
+        result = await asyncio.to_thread(collection.aggregate.over_all, total_count=True)
+        count = result.total_count or 0
+        self._count_cache.set("count", count, generation)
+        return count
+    
+    async def _search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Run a near_text search, caching results per (query, limit) between writes.
+
+        Callers get a copy, so mutating the returned results never touches the cache.
+        """
+        results = self._search_cache.get((query, limit))
+        if results is not None:
+            return copy.deepcopy(results)
+        
+        # Read before the search so results from before a write aren't cached after it
+        generation = self._search_cache.generation
+        collection = self._collection
+        response = await asyncio.to_thread(
+            collection.query.near_text,
+            query=query,
+            limit=limit
+        )
+        
+        results = []
+        for obj in response.objects:
+            results.append({
+                "content": obj.properties.get("content", ""),
+                "metadata": obj.properties.get("metadata", {}),
+                "distance": getattr(obj.metadata, 'distance', None)
+            })
+        
+        self._search_cache.set((query, limit), results, generation)
+        return copy.deepcopy(results)
+    
+    def _clear_query_caches(self):
+        """Drop cached search results and counts after the collection changes."""
+        self._search_cache.clear()
+        self._count_cache.clear()
+    
+    async def iter_document_id_pages(self, page_size: int = 1000) -> AsyncIterator[List[str]]:
+        """Yield document IDs one cursor page at a time, without properties or vectors."""
+        collection = self._collection
+        after = None
+        while True:
+            response = await asyncio.to_thread(
+                collection.query.fetch_objects,
+                limit=page_size,
+                after=after,
+                return_properties=[],
+                include_vector=False
             )
+            if not response.objects:
+                return
             
-            chunks = text_splitter.split_documents(documents)
-            
-            # Prepare data for Weaviate
-            collection = self.weaviate_client.collections.get(WEAVIATE_COLLECTION_NAME)
-            
-            data_objects = []
-            for i, chunk in enumerate(chunks):
-                # Add file_id and chunk info to metadata
-                metadata = chunk.metadata.copy()
-                metadata.update({
-                    "file_id": file_id,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks)
-                })
-                
-                data_objects.append({
-                    "content": chunk.page_content,
-                    "metadata": metadata
-                })
+            yield [str(obj.uuid) for obj in response.objects]
+            after = response.objects[-1].uuid
+    
+    async def get_all_document_ids(self) -> List[str]:
+        """Retrieve all document IDs from the collection."""
+        return [doc_id async for page in self.iter_document_id_pages() for doc_id in page]
+    
+    def _store_chunks(self, documents: List[Document], file_id: str) -> int:
+        """Split documents and batch insert the chunks (blocking)."""
+        # Split documents into chunks
+        chunks = self._splitter.split_documents(documents)
+        
+        collection = self._collection
+        
+        # File-level metadata shared by every chunk of this file
+        file_metadata = {"file_id": file_id, "total_chunks": len(chunks)}
+        
+        with self._batch_lock:
+            # Batch insert into Weaviate, adding file_id and chunk info to metadata
+            with collection.batch.fixed_size(
+                batch_size=WEAVIATE_BATCH_SIZE,
+                concurrent_requests=WEAVIATE_BATCH_CONCURRENCY
+            ) as batch:
+                for i, chunk in enumerate(chunks):
+                    batch.add_object(properties={
+                        "content": chunk.page_content,
+                        "metadata": {**chunk.metadata, **file_metadata, "chunk_index": i},
+                        # Top-level copy so deletes can filter on it server-side
+                        "file_id": file_id
+                    })
             
-            # Batch insert into Weaviate
-            with collection.batch.dynamic() as batch:
-                for data_obj in data_objects:
-                    batch.add_object(properties=data_obj)
+            # Read inside the lock; the next batch resets failed_objects
+            failed_objects = collection.batch.failed_objects
+            if failed_objects:
+                raise RuntimeError(
+                    f"{len(failed_objects)} of {len(chunks)} chunks failed to insert: "
+                    f"{failed_objects[0].message}"
+                )
+        
+        return len(chunks)
+    
+    async def store_documents(self, documents: List[Document], file_id: str) -> bool:
+        """Store documents in Weaviate with chunking."""
+        try:
+            chunk_count = await asyncio.to_thread(self._store_chunks, documents, file_id)
             
-            logger.info(f"Stored {len(chunks)} document chunks for file_id: {file_id}")
+            logger.info(f"Stored {chunk_count} document chunks for file_id: {file_id}")
             return True
             
         except Exception as e:
             logger.error(f"Error storing documents: {e}")
             return False
+        finally:
+            self._clear_query_caches()
     
     async def delete_documents_by_file_id(self, file_id: str) -> bool:
         """Delete all documents associated with a file_id."""
         try:
-            collection = self.weaviate_client.collections.get(WEAVIATE_COLLECTION_NAME)
+            collection = self._collection
             
-            # First, find documents with the file_id
-            response = collection.query.fetch_objects(
-                where=weaviate.classes.query.Filter.by_property("metadata").contains_any(["file_id", file_id]),
-                limit=10000
+            # Let Weaviate match and delete in a single request
+            result = await asyncio.to_thread(
+                collection.data.delete_many,
+                where=weaviate.classes.query.Filter.by_property("file_id").equal(file_id)
             )
             
-            if not response.objects:
+            if not result.matches:
                 logger.warning(f"No documents found for file_id: {file_id}")
                 return False
             
-            # Delete documents by UUID
-            uuids_to_delete = [obj.uuid for obj in response.objects]
-            collection.data.delete_many(
-                where=weaviate.classes.query.Filter.by_id().contains_any(uuids_to_delete)
-            )
-            
-            logger.info(f"Deleted {len(uuids_to_delete)} documents for file_id: {file_id}")
+            logger.info(f"Deleted {result.successful} documents for file_id: {file_id}")
             return True
             
         except Exception as e:
             logger.error(f"Error deleting documents: {e}")
             return False
+        finally:
+            self._clear_query_caches()
+    
+    def _run_elysia_tree(self, query: str, collection_names: List[str]) -> tuple[str, List[Dict[str, Any]]]:
+        """Run the shared Elysia tree, one query at a time (blocking)."""
+        with self._tree_lock:
+            return self.elysia_tree(query, collection_names=collection_names)
     
     async def query_with_elysia(self, query: str, collection_names: Optional[List[str]] = None) -> tuple[str, List[Dict[str, Any]]]:
         """Use Elysia's agentic capabilities to query documents."""
@@ -176,9 +249,8 @@ class ElysiaWeaviateService:
             collection_names = collection_names or [WEAVIATE_COLLECTION_NAME]
             
             # Use Elysia's built-in Weaviate integration
-            response, objects = self.elysia_tree(
-                query,
-                collection_names=collection_names
+            response, objects = await asyncio.to_thread(
+                self._run_elysia_tree, query, collection_names
             )
             
             return response, objects
@@ -190,22 +262,7 @@ class ElysiaWeaviateService:
     async def simple_query(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Simple semantic search without Elysia agent reasoning."""
         try:
-            collection = self.weaviate_client.collections.get(WEAVIATE_COLLECTION_NAME)
-            response = collection.query.near_text(
-                query=query,
-                limit=limit
-            )
-            
-            results = []
-            for obj in response.objects:
-                results.append({
-                    "content": obj.properties.get("content", ""),
-                    "metadata": obj.properties.get("metadata", {}),
-                    "distance": obj.metadata.distance if hasattr(obj.metadata, 'distance') else None
-                })
-            
-            return results
-            
+            return await self._search(query, limit)
         except Exception as e:
             logger.error(f"Error in simple query: {e}")
             return []
@@ -217,5 +274,6 @@ class ElysiaWeaviateService:
             logger.info("Weaviate connection closed")
 
 
-# Global service instance
-elysia_service = ElysiaWeaviateService()
\ No newline at end of file
+def get_elysia(request: Request) -> ElysiaWeaviateService:
+    """FastAPI dependency returning the service created in the app lifespan."""
+    return request.app.state.elysia
\ No newline at end of file
@@ -1,13 +1,7 @@
 # app/utils/health.py
-from app.config import VECTOR_DB_TYPE, VectorDBType
-from app.services.database import pg_health_check
-from app.services.mongo_client import mongo_health_check
+import asyncio
 
 
-def is_health_ok():
-    if VECTOR_DB_TYPE == VectorDBType.PGVECTOR:
-        return pg_health_check()
-    if VECTOR_DB_TYPE == VectorDBType.ATLAS_MONGO:
-        return mongo_health_check()
-    else:
-        return True
\ No newline at end of file
+async def is_health_ok(elysia_service) -> bool:
+    """Report whether the service's Weaviate connection is ready."""
+    return await asyncio.to_thread(elysia_service.weaviate_client.is_ready)
@@ -11,17 +11,18 @@ from app.config import debug_mode, RAG_HOST, RAG_PORT, CHUNK_SIZE, CHUNK_OVERLAP
     LogMiddleware, logger
 from app.middleware import security_middleware
 from app.routes import document_routes
-from app.services.elysia_service import elysia_service
+from app.services.elysia_service import ElysiaWeaviateService
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup logic - Weaviate connection is handled in elysia_service
+    # Startup logic - open the Weaviate connection once per process
     logger.info("Starting RAG API with Weaviate + Elysia")
+    app.state.elysia = ElysiaWeaviateService()
     
     yield
     
     # Shutdown logic
-    elysia_service.close()
+    app.state.elysia.close()
 
 app = FastAPI(lifespan=lifespan, debug=debug_mode)
 
@@ -0,0 +1,163 @@
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.routes import document_routes
+from app.services.elysia_service import get_elysia
+
+
+class DummyElysiaService:
+    def __init__(self, pages=None, error=None, store_ok=True):
+        self.pages = pages or []
+        self.error = error
+        self.store_ok = store_ok
+        self.stored = []
+
+    async def get_document_count(self):
+        if self.error:
+            raise self.error
+        return sum(len(page) for page in self.pages)
+
+    async def store_documents(self, documents, file_id):
+        self.stored.append((documents, file_id))
+        return self.store_ok
+
+    async def iter_document_id_pages(self):
+        if self.error:
+            raise self.error
+        for page in self.pages:
+            yield page
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # The development secret disables JWT checks in security_middleware.
+    monkeypatch.setenv("JWT_SECRET", "development-secret-key-change-in-production")
+    # No `with` block, so the lifespan (and its Weaviate connection) never runs.
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def use_service(service):
+    app.dependency_overrides[get_elysia] = lambda: service
+
+
+def test_get_all_ids_streams_every_page(client):
+    use_service(DummyElysiaService(pages=[["id1", "id2"], ["id3"]]))
+    response = client.get("/ids")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"ids": ["id1", "id2", "id3"], "count": 3}
+
+
+def test_get_all_ids_empty_collection(client):
+    use_service(DummyElysiaService(pages=[]))
+    response = client.get("/ids")
+    assert response.status_code == 200
+    assert response.json() == {"ids": [], "count": 0}
+
+
+def test_get_all_ids_returns_500_when_first_page_fails(client):
+    use_service(DummyElysiaService(error=ConnectionError("weaviate down")))
+    response = client.get("/ids")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "weaviate down"}
+
+
+def test_get_document_count(client):
+    use_service(DummyElysiaService(pages=[["id1", "id2"]]))
+    response = client.get("/count")
+    assert response.status_code == 200
+    assert response.json() == {"count": 2}
+
+
+@pytest.mark.parametrize("path", ["/count", "/stats/project-1"])
+def test_count_routes_return_500_when_weaviate_fails(client, path):
+    use_service(DummyElysiaService(error=ConnectionError("weaviate down")))
+    response = client.get(path)
+    assert response.status_code == 500
+    assert response.json() == {"detail": "weaviate down"}
+
+
+def test_store_document_loads_file_with_metadata(client, tmp_path):
+    service = DummyElysiaService()
+    use_service(service)
+    test_file = tmp_path / "notes.txt"
+    test_file.write_text("Stored\x00 content")
+
+    response = client.post(
+        "/store",
+        json={
+            "filepath": str(test_file),
+            "filename": "notes.txt",
+            "file_content_type": "text/plain",
+            "file_id": "file-1",
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["chunks_created"] == 1
+
+    documents, file_id = service.stored[0]
+    assert file_id == "file-1"
+    assert documents[0].page_content == "Stored content"
+    assert documents[0].metadata["file_id"] == "file-1"
+    assert documents[0].metadata["filename"] == "notes.txt"
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "uploads"
+    directory.mkdir()
+    monkeypatch.setattr(document_routes, "RAG_UPLOAD_DIR", str(directory))
+    return directory
+
+
+def upload(client, content, file_id=None):
+    data = {"file_id": file_id} if file_id else {}
+    return client.post(
+        "/upload", data=data, files={"file": ("doc.txt", content, "text/plain")}
+    )
+
+
+def test_upload_derives_file_id_from_content(client, upload_dir):
+    service = DummyElysiaService()
+    use_service(service)
+    content = b"Uploaded content"
+
+    response = upload(client, content)
+    assert response.status_code == 200, response.text
+    expected_id = hashlib.blake2b(content, digest_size=16).hexdigest()
+    assert response.json()["file_id"] == expected_id
+    assert service.stored[0][1] == expected_id
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_keeps_supplied_file_id(client, upload_dir):
+    service = DummyElysiaService()
+    use_service(service)
+
+    response = upload(client, b"Uploaded content", file_id="my-file")
+    assert response.status_code == 200, response.text
+    assert response.json()["file_id"] == "my-file"
+    assert service.stored[0][1] == "my-file"
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_without_content_returns_400_and_cleans_up(client, upload_dir):
+    service = DummyElysiaService()
+    use_service(service)
+
+    response = upload(client, b"\x00\x00")
+    assert response.status_code == 400
+    assert service.stored == []
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_store_failure_returns_500_and_cleans_up(client, upload_dir):
+    use_service(DummyElysiaService(store_ok=False))
+
+    response = upload(client, b"Uploaded content")
+    assert response.status_code == 500
+    assert list(upload_dir.iterdir()) == []
@@ -1,4 +1,4 @@
-from app.config import RAG_HOST, RAG_PORT, CHUNK_SIZE, CHUNK_OVERLAP, PDF_EXTRACT_IMAGES, VECTOR_DB_TYPE
+from app.config import RAG_HOST, RAG_PORT, CHUNK_SIZE, CHUNK_OVERLAP, PDF_EXTRACT_IMAGES
 
 def test_config_defaults():
     assert RAG_HOST is not None
@@ -6,4 +6,55 @@ def test_config_defaults():
     assert isinstance(CHUNK_SIZE, int)
     assert isinstance(CHUNK_OVERLAP, int)
     assert isinstance(PDF_EXTRACT_IMAGES, bool)
-    assert VECTOR_DB_TYPE is not None
\ No newline at end of file
+
+def test_get_env_variable_reads_cached_snapshot(monkeypatch):
+    from app import config
+    from app.config import get_env_variable, reload_env_cache
+
+    # Restore the original snapshot afterwards so the test variable doesn't leak
+    monkeypatch.setattr(config, "_ENV_CACHE", dict(config._ENV_CACHE))
+    monkeypatch.setenv("RAG_TEST_CACHED_VAR", "before")
+    reload_env_cache()
+    monkeypatch.setenv("RAG_TEST_CACHED_VAR", "after")
+    assert get_env_variable("RAG_TEST_CACHED_VAR") == "before"
+
+    reload_env_cache()
+    assert get_env_variable("RAG_TEST_CACHED_VAR") == "after"
+
+
+def test_every_embeddings_provider_has_defaults():
+    from app.config import EmbeddingsProvider, _PROVIDER_DEFAULTS
+
+    for provider in EmbeddingsProvider:
+        assert _PROVIDER_DEFAULTS[provider]["model"]
+
+
+def test_queued_json_log_keeps_exception():
+    import io
+    import json
+    import queue
+    import logging
+    from logging.handlers import QueueListener
+    from app.config import JsonFormatter, LocalQueueHandler
+
+    stream = io.StringIO()
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler)
+
+    test_logger = logging.getLogger("rag_api.test_queued_json")
+    test_logger.propagate = False
+    test_logger.addHandler(LocalQueueHandler(log_queue))
+
+    listener.start()
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        test_logger.error("Upload failed for %s", "file.txt", exc_info=True)
+    finally:
+        listener.stop()
+
+    record = json.loads(stream.getvalue())
+    assert record["message"] == "Upload failed for file.txt"
+    assert "ValueError: boom" in record["exception"]
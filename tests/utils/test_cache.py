@@ -0,0 +1,47 @@
+from app.utils import cache
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    ttl_cache = TTLCache(maxsize=4, ttl=5)
+
+    ttl_cache.set(("query", 10), ["result"])
+    now[0] += 4
+    assert ttl_cache.get(("query", 10)) == ["result"]
+
+    now[0] += 1
+    assert ttl_cache.get(("query", 10)) is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    ttl_cache = TTLCache(maxsize=2, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    assert ttl_cache.get("a") == 1
+
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("c") == 3
+
+
+def test_ttl_cache_clear():
+    ttl_cache = TTLCache(maxsize=1, ttl=5)
+    ttl_cache.set("count", 7)
+    ttl_cache.clear()
+    assert ttl_cache.get("count") is None
+
+
+def test_ttl_cache_skips_set_from_before_clear():
+    ttl_cache = TTLCache(maxsize=4, ttl=30)
+    generation = ttl_cache.generation
+
+    # A write invalidates the cache while a lookup started earlier is in flight
+    ttl_cache.clear()
+    ttl_cache.set("query", ["stale"], generation)
+    assert ttl_cache.get("query") is None
+
+    ttl_cache.set("query", ["fresh"], ttl_cache.generation)
+    assert ttl_cache.get("query") == ["fresh"]